@@ -1,19 +1,33 @@
 import streamlit as st
-import bcrypt
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, asc, desc
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, LargeBinary, ForeignKey, DateTime, Index, asc, desc, select, insert, delete, bindparam, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from sqlalchemy.pool import QueuePool
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import requests
-import openai
-from openai.error import RateLimitError, OpenAIError
 from datetime import datetime
-import json
-import io
-from googletrans import Translator
+from typing import NamedTuple
+import orjson
+import ijson
+import asyncio
+import aiohttp
+import math
 import time
+import hashlib
+import functools
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
+from urllib3.util.retry import Retry
+from retry import retry_with_backoff
+from passwords import hash_password, check_password
+from db_utils import set_sqlite_pragmas, ensure_indexes, migrate_password_hashes
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -34,11 +48,22 @@ class Meal(Base):
     fats = Column(Float, default=0.0)
     date = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    # user_id로 시작하는 복합 인덱스이므로 user_id 단독 조회에도 사용됩니다.
+    # 정렬 기준별 인덱스는 사용자별 ORDER BY를 정렬 없이 인덱스 순서대로 읽도록 합니다.
+    __table_args__ = (
+        Index('ix_meals_user_date', 'user_id', 'date'),
+        Index('ix_meal_user_cal', 'user_id', 'calories'),
+        Index('ix_meal_user_pro', 'user_id', 'proteins'),
+        Index('ix_meal_user_carb', 'user_id', 'carbs'),
+        Index('ix_meal_user_fat', 'user_id', 'fats'),
+        Index('ix_meal_user_name', 'user_id', 'name'),
+    )
+
 # ManualMeal 모델 정의 (식단 입력용)
 class ManualMeal(Base):
     __tablename__ = 'manual_meals'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     name = Column(String, nullable=False)
     date = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -47,7 +72,7 @@ class User(Base):
     __tablename__ = 'users'
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String, unique=True, nullable=False)
-    password = Column(String, nullable=False)
+    password = Column(LargeBinary(60), nullable=False)  # bcrypt 해시 (bytes)
     meals = relationship('Meal', backref='user', cascade="all, delete-orphan")
     manual_meals = relationship('ManualMeal', backref='user', cascade="all, delete-orphan")
 
@@ -58,48 +83,102 @@ class ProductTranslation(Base):
     barcode = Column(String, unique=True, nullable=False)
     translated_name = Column(String, nullable=False)
 
-# 데이터베이스 초기화 함수
+# 데이터베이스 초기화 함수 (프로세스당 한 번만 엔진 생성)
+@st.cache_resource
 def initialize_database():
-    engine = create_engine('sqlite:///meals.db', echo=False)
+    # Streamlit은 여러 스레드에서 스크립트를 실행하므로 연결 풀의 연결을 스레드 간에 재사용할 수 있도록 설정
+    engine = create_engine(
+        'sqlite:///meals.db',
+        echo=False,
+        connect_args={'check_same_thread': False},
+        poolclass=QueuePool
+    )
+    event.listen(engine, 'connect', set_sqlite_pragmas)
     Base.metadata.create_all(engine)
+    ensure_indexes(engine, Base.metadata)
+    migrate_password_hashes(engine)
     return engine
 
-# 데이터베이스 세션 생성
+# 데이터베이스 세션 레지스트리 생성 (스레드별로 하나의 세션을 공유하고, 스크립트 실행이 끝나면 정리)
+@st.cache_resource
+def create_session_registry():
+    return scoped_session(sessionmaker(bind=initialize_database()))
+
 engine = initialize_database()
-Session_db = sessionmaker(bind=engine)
+Session_db = create_session_registry()
+
+# 한 번의 실행(전체 스크립트 또는 fragment) 동안 사용한 데이터베이스 세션을 정리하는 데코레이터 (st.rerun/st.stop 포함)
+# fragment만 다시 실행될 때는 main()이 실행되지 않으므로 fragment 함수에도 따로 적용
+def release_db_session(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            Session_db.remove()
+    return wrapper
+
+# 자주 실행되는 쿼리 (bindparam으로 값만 바꿔 실행하므로 SQLAlchemy의 컴파일 캐시를 그대로 재사용)
+USER_LOGIN_QUERY = select(User.id, User.password).where(User.username == bindparam('username'))
+USER_BY_ID_QUERY = select(User).where(User.id == bindparam('user_id'))
+MEALS_BY_USER_QUERY = select(
+    Meal.id, Meal.name, Meal.calories, Meal.proteins, Meal.carbs, Meal.fats, Meal.date
+).where(Meal.user_id == bindparam('user_id'))
+MANUAL_MEALS_BY_USER_QUERY = select(
+    ManualMeal.id, ManualMeal.name, ManualMeal.date
+).where(ManualMeal.user_id == bindparam('user_id'))
+MEAL_TOTALS_BY_USER_QUERY = select(
+    func.sum(Meal.calories), func.sum(Meal.proteins), func.sum(Meal.carbs), func.sum(Meal.fats)
+).where(Meal.user_id == bindparam('user_id'))
+DELETE_MEAL_QUERY = delete(Meal).where(
+    Meal.id == bindparam('meal_id'), Meal.user_id == bindparam('user_id')
+).execution_options(synchronize_session=False)
+DELETE_MEALS_QUERY = delete(Meal).where(
+    Meal.id.in_(bindparam('meal_ids', expanding=True)), Meal.user_id == bindparam('user_id')
+).execution_options(synchronize_session=False)
+DELETE_MANUAL_MEAL_QUERY = delete(ManualMeal).where(
+    ManualMeal.id == bindparam('meal_id'), ManualMeal.user_id == bindparam('user_id')
+).execution_options(synchronize_session=False)
 
 # 사용자 생성 함수
 def create_user(username, password):
     session = Session_db()
     try:
-        if session.query(User).filter_by(username=username).first():
+        if session.query(User.id).filter_by(username=username).first():
             return False  # 사용자 이미 존재
-        hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        new_user = User(username=username, password=hashed_pw.decode('utf-8'))
+        hashed_pw = hash_password(password)
+        new_user = User(username=username, password=hashed_pw)
         session.add(new_user)
         session.commit()
+        _verify_login.clear()  # 가입 전에 캐시된 로그인 실패 결과 제거
         return True
     except Exception as e:
         session.rollback()
         st.error(f"사용자 생성 중 오류 발생: {e}")
         return False
-    finally:
-        session.close()
+
+# 캐시된 로그인 검증 함수 (사용자 ID 또는 None 반환)
+# 캐시 키는 사용자 이름과 비밀번호의 해시값이며, 밑줄로 시작하는 _password는 캐시 키에서 제외됩니다.
+@st.cache_data(ttl=300, show_spinner=False)  # 5분 동안 캐시
+def _verify_login(username, password_digest, _password):
+    session = Session_db()
+    user = session.execute(USER_LOGIN_QUERY, {'username': username}).first()
+    if user and check_password(_password, user.password):
+        return user.id
+    return None
 
 # 사용자 로그인 함수
 def login_user(username, password):
-    session = Session_db()
     try:
-        user = session.query(User).filter_by(username=username).first()
-        if user and bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
-            return True, "로그인 성공", user.id
+        password_digest = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        user_id = _verify_login(username, password_digest, password)
+        if user_id is not None:
+            return True, "로그인 성공", user_id
         else:
             return False, "사용자 이름 또는 비밀번호가 올바르지 않습니다.", None
     except Exception as e:
         st.error(f"로그인 중 오류 발생: {e}")
         return False, "로그인 중 오류가 발생했습니다.", None
-    finally:
-        session.close()
 
 # 음식 추가 함수 (식단 관리용)
 def add_diet(user_id, meal):
@@ -116,13 +195,12 @@ def add_diet(user_id, meal):
         )
         session.add(new_meal)
         session.commit()
+        invalidate_meal_cache()
         return True
     except Exception as e:
         session.rollback()
         st.error(f"데이터베이스에 저장 중 오류 발생: {e}")
         return False
-    finally:
-        session.close()
 
 # 수동 식단 추가 함수 (식단 입력용)
 def add_manual_meal(user_id, meal):
@@ -135,168 +213,296 @@ def add_manual_meal(user_id, meal):
         )
         session.add(new_manual_meal)
         session.commit()
+        invalidate_meal_cache()
         return True
     except Exception as e:
         session.rollback()
         st.error(f"데이터베이스에 저장 중 오류 발생: {e}")
         return False
-    finally:
-        session.close()
 
-# 식단 가져오기 함수 (식단 관리용)
-def get_diets(user_id):
-    session = Session_db()
+# 조회 결과 행 (세션과 무관한 불변 튜플이므로 캐시에 저장하고 꺼내는 비용이 작음)
+class ManualMealRow(NamedTuple):
+    id: int
+    name: str
+    date: datetime
+
+# 캐시된 수동 식단 조회 함수 (조회 중 오류는 예외로 전달되므로 캐시되지 않음)
+@st.cache_data(ttl=60, max_entries=128, show_spinner=False)
+def _fetch_manual_meals(user_id):
+    return [ManualMealRow(*row) for row in Session_db().execute(MANUAL_MEALS_BY_USER_QUERY, {'user_id': user_id})]
+
+# 영양소 합계를 SQL에서 계산하는 캐시된 함수 (칼로리, 단백질, 탄수화물, 지방 순서)
+@st.cache_data(ttl=30, max_entries=128, show_spinner=False)
+def _fetch_diet_totals(user_id):
+    totals = Session_db().execute(MEAL_TOTALS_BY_USER_QUERY, {'user_id': user_id}).one()
+    return tuple(total or 0 for total in totals)
+
+# 식단 데이터가 변경된 후 캐시된 조회 결과를 무효화하는 함수
+def invalidate_meal_cache():
+    _fetch_manual_meals.clear()
+    _fetch_diet_totals.clear()
+
+# 영양소 합계 가져오기 함수 (칼로리, 단백질, 탄수화물, 지방)
+def get_diet_totals(user_id):
     try:
-        meals = session.query(Meal).filter_by(user_id=user_id).all()
-        return meals
+        return _fetch_diet_totals(user_id)
     except Exception as e:
-        st.error(f"식단을 불러오는 중 오류 발생: {e}")
-        return []
-    finally:
-        session.close()
+        st.error(f"영양소 합계를 불러오는 중 오류 발생: {e}")
+        return 0, 0, 0, 0
 
-# 수동 식단 가져오기 함수 (식단 입력용)
+# 수동 식단 가져오기 함수 (식단 입력용) - 읽기 전용이므로 ORM 객체 대신 Row 튜플 반환
 def get_manual_meals(user_id):
-    session = Session_db()
     try:
-        manual_meals = session.query(ManualMeal).filter_by(user_id=user_id).all()
-        return manual_meals
+        return _fetch_manual_meals(user_id)
     except Exception as e:
         st.error(f"수동 식단을 불러오는 중 오류 발생: {e}")
         return []
-    finally:
-        session.close()
 
 # 음식 삭제 함수 (식단 관리용)
 def delete_meal(user_id, meal_id):
     session = Session_db()
     try:
-        meal = session.query(Meal).filter_by(id=meal_id, user_id=user_id).first()
-        if meal:
-            session.delete(meal)
-            session.commit()
-            return True
-        else:
-            return False
+        result = session.execute(DELETE_MEAL_QUERY, {'meal_id': meal_id, 'user_id': user_id})
+        session.commit()
+        invalidate_meal_cache()
+        return result.rowcount > 0
     except Exception as e:
         session.rollback()
         st.error(f"음식 삭제 중 오류 발생: {e}")
         return False
-    finally:
-        session.close()
+
+# 여러 음식을 한 번의 DELETE ... IN 쿼리로 삭제하는 함수 (삭제된 행 수 반환)
+def delete_meals(user_id, meal_ids):
+    if not meal_ids:
+        return 0
+    session = Session_db()
+    try:
+        result = session.execute(DELETE_MEALS_QUERY, {'meal_ids': list(meal_ids), 'user_id': user_id})
+        session.commit()
+        invalidate_meal_cache()
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        st.error(f"음식 삭제 중 오류 발생: {e}")
+        return 0
 
 # 수동 식단 삭제 함수 (식단 입력용)
 def delete_manual_meal(user_id, meal_id):
     session = Session_db()
     try:
-        manual_meal = session.query(ManualMeal).filter_by(id=meal_id, user_id=user_id).first()
-        if manual_meal:
-            session.delete(manual_meal)
-            session.commit()
-            return True
-        else:
-            return False
+        result = session.execute(DELETE_MANUAL_MEAL_QUERY, {'meal_id': meal_id, 'user_id': user_id})
+        session.commit()
+        invalidate_meal_cache()
+        return result.rowcount > 0
     except Exception as e:
         session.rollback()
         st.error(f"수동 식단 삭제 중 오류 발생: {e}")
         return False
-    finally:
-        session.close()
 
 # 사용자 가져오기 함수
 def get_user(user_id):
     session = Session_db()
     try:
-        user = session.query(User).filter_by(id=user_id).first()
+        user = session.execute(USER_BY_ID_QUERY, {'user_id': user_id}).scalar()
         return user
     except Exception as e:
         st.error(f"사용자를 가져오는 중 오류 발생: {e}")
         return None
-    finally:
-        session.close()
 
 # 비밀번호 검증 함수
 def verify_password(stored_password, provided_password):
-    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+    return check_password(provided_password, stored_password)
 
-# OpenAI API 키 설정
-API_KEY = st.secrets["OPENAI_API_KEY"]
-openai.api_key = API_KEY
+# 번역 API 설정
+TRANSLATE_URL = 'https://translate.googleapis.com/translate_a/single'
+TRANSLATE_CONCURRENCY = 20  # 동시에 보낼 번역 요청 수
 
-# Chatbot 클래스 정의
-class Chatbot:
-    def __init__(self, counseling_data, model="gpt-3.5-turbo"):
-        self.counseling_data = counseling_data
-        self.current_session = [{"role": "system", "content": "You are a helpful counseling assistant."}]
-        self.initial_question = "Hello! I am a Chatbot."
-        self.model = model
+async def _fetch_translation(session, text, dest):
+    params = {'client': 'gtx', 'sl': 'auto', 'tl': dest, 'dt': 't', 'q': text}
+    async with session.get(TRANSLATE_URL, params=params) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+    # 응답의 첫 번째 요소는 [번역문, 원문, ...] 조각들의 목록입니다.
+    return ''.join(segment[0] for segment in data[0] if segment[0])
+
+async def _translate_batch(texts, dest):
+    timeout = aiohttp.ClientTimeout(total=10)
+    connector = aiohttp.TCPConnector(limit=TRANSLATE_CONCURRENCY)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        return await asyncio.gather(
+            *(_fetch_translation(session, text, dest) for text in texts),
+            return_exceptions=True
+        )
 
-    def get_openai_response(self, conversation):
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=conversation
-            )
-            return response.choices[0].message["content"]
-        except RateLimitError:
-            return "현재 서비스 이용량이 초과되었습니다. 잠시 후 다시 시도해주세요."
-        except OpenAIError as e:
-            return f"오류가 발생했습니다: {e}"
-
-    def chat(self, user_input=None):
-        if user_input:
-            self.current_session.append({"role": "user", "content": user_input})
-        conversation = self.current_session
-        response = self.get_openai_response(conversation)
-        self.current_session.append({"role": "assistant", "content": response})
-        return response
-
-    def provide_feedback(self, statistics_summary):
-        self.current_session.append({"role": "system", "content": f"Here is today's nutrition summary: {statistics_summary}"})
-        user_input = "오늘 섭취량에 대해 어떻게 생각하나요?"
-        self.current_session.append({"role": "user", "content": user_input})
-        response = self.get_openai_response(self.current_session)
-        self.current_session.append({"role": "assistant", "content": response})
-        return response
-
-# 번역기 초기화
-translator = Translator()
+# 프로세스 내 번역 결과 LRU 캐시 (같은 제품 이름이 여러 페이지에 반복될 때 API 요청 없이 바로 반환)
+class TranslationMemo:
+    def __init__(self, maxsize=8192):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+# 스크립트가 다시 실행되어도 유지되도록 프로세스당 하나만 생성
+@st.cache_resource
+def get_translation_memo():
+    return TranslationMemo(maxsize=8192)
+
+# 여러 텍스트를 한 번에 번역하는 함수 (번역에 실패한 항목은 None)
+def translate_texts(texts, dest='ko'):
+    memo = get_translation_memo()
+    translations = {}
+    missing_texts = []
+    for text in dict.fromkeys(texts):  # 중복된 텍스트는 한 번만 요청
+        cached = memo.get((text, dest))
+        if cached is not None:
+            translations[text] = cached
+        else:
+            missing_texts.append(text)
+    if not missing_texts:
+        return [translations[text] for text in texts]
+
+    results = asyncio.run(_translate_batch(missing_texts, dest))
+    for text, result in zip(missing_texts, results):
+        if isinstance(result, Exception):
+            logger.error(f"번역 중 오류 발생: {result}")
+            translations[text] = None
+        else:
+            translations[text] = result
+            memo.put((text, dest), result)
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    if failed:
+        st.error(f"번역 중 오류 발생: {failed}개의 항목을 번역하지 못했습니다.")
+    return [translations[text] for text in texts]
+
+# 번역 캐시 저장 함수 (INSERT ... ON CONFLICT DO NOTHING 한 번으로 저장하여 동시 요청 시 UNIQUE 충돌 방지)
+def save_translations(session, translations):
+    stmt = sqlite_insert(ProductTranslation).values([
+        {'barcode': barcode, 'translated_name': translated_name}
+        for barcode, translated_name in translations.items()
+    ]).on_conflict_do_nothing(index_elements=['barcode'])
+    session.execute(stmt)
+    session.commit()
+
+# 한글(가-힣)이 포함된 텍스트인지 확인하는 함수
+def contains_hangul(text):
+    return any('\uac00' <= char <= '\ud7a3' for char in text)
 
 # 캐시된 번역 함수
-@st.cache_data(ttl=86400)  # 24시간 동안 캐시
-def translate_to_korean_cached(text, barcode=None):
-    session = Session_db()
-    try:
-        if barcode:
-            translation = session.query(ProductTranslation).filter_by(barcode=barcode).first()
-            if translation:
-                return translation.translated_name
-
-        translation = translator.translate(text, dest='ko').text
-
-        if barcode:
-            new_translation = ProductTranslation(barcode=barcode, translated_name=translation)
-            session.add(new_translation)
-            session.commit()
-
-        return translation
-    except Exception as e:
-        st.error(f"번역 중 오류 발생: {e}")
-        return text  # 번역 실패 시 원본 텍스트 반환
-    finally:
-        session.close()
-
 @st.cache_data(ttl=86400)  # 24시간 동안 캐시
 def translate_to_english_cached(text):
     try:
-        translation = translator.translate(text, dest='en').text
-        return translation
+        translation = translate_texts([text], dest='en')[0]
+        return translation if translation is not None else text  # 번역 실패 시 원본 텍스트 반환
     except Exception as e:
         st.error(f"영어로 번역 중 오류 발생: {e}")
         return text  # 번역 실패 시 원본 텍스트 반환
 
-# 세션 사용을 통한 성능 향상
-session_requests = requests.Session()
+# 제품 목록의 이름을 한국어로 일괄 번역하는 함수 (바코드별 번역 결과는 DB에 캐시)
+def translate_product_names(products):
+    names = []
+    pending = []  # 번역이 필요한 (인덱스, 바코드, 제품 이름)
+    new_translations = {}  # DB 캐시에 저장할 {바코드: 번역된 이름}
+    session = Session_db()
+    # 페이지의 모든 바코드에 대한 번역 캐시를 한 번의 쿼리로 가져오기
+    barcodes = [product.get('code') for product in products if product.get('code')]
+    cached_translations = {}
+    if barcodes:
+        cached_translations = dict(
+            session.query(ProductTranslation.barcode, ProductTranslation.translated_name)
+            .filter(ProductTranslation.barcode.in_(barcodes))
+            .all()
+        )
+
+    for index, product in enumerate(products):
+        name = product.get('product_name_KR')
+        if not name:
+            product_name = product.get('product_name')
+            barcode = product.get('code')
+            if not product_name:
+                name = '이름 없음'
+            else:
+                if barcode:
+                    name = cached_translations.get(barcode)
+                if not name:
+                    name = product_name  # 이미 한국어이거나 번역 실패 시 원본 텍스트 사용
+                    if contains_hangul(product_name):
+                        # 이미 한국어인 이름은 번역하지 않고 그대로 캐시에 저장
+                        if barcode:
+                            new_translations[barcode] = product_name
+                    else:
+                        pending.append((index, barcode, product_name))
+        names.append(name)
+
+    if pending:
+        translations = translate_texts([product_name for _, _, product_name in pending], dest='ko')
+        for (index, barcode, _), translation in zip(pending, translations):
+            if translation is None:
+                continue
+            names[index] = translation
+            if barcode:
+                new_translations[barcode] = translation
+    if new_translations:
+        try:
+            save_translations(session, new_translations)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"번역 캐시 저장 중 오류 발생: {e}")
+    return names
+
+# 화면에 표시할 제품 필드 (바코드, 제조사, 카테고리)
+PRODUCT_ROW_FIELDS = ('code', 'brands', 'categories')
+
+# 제품 목록을 화면 표시용 레코드 목록으로 변환하는 함수
+def build_product_rows(products, names):
+    rows = []
+    for product, name in zip(products, names):
+        barcode, brands, categories = map(product.get, PRODUCT_ROW_FIELDS)
+        rows.append({
+            '제품 이름': name,
+            '바코드': barcode or '바코드 없음',
+            '제조사': brands.replace(',', ', ') if brands else '제조사 없음',
+            '카테고리': categories.replace(',', ', ') if categories else '카테고리 없음'
+        })
+    return rows
+
+# 세션 사용을 통한 성능 향상 (프로세스당 하나의 연결 풀을 재사용)
+# 재시도는 호출하는 쪽(retry_with_backoff 등)에서만 하므로 어댑터 자체는 재시도하지 않음
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=50,
+        pool_maxsize=50,
+        max_retries=Retry(total=0, raise_on_status=False)
+    )
+    session.mount("https://", adapter)
+    return session
+
+# 재시도할 HTTP 요청 예외
+HTTP_RETRY_EXCEPTIONS = (ChunkedEncodingError, ConnectionError, Timeout, requests.HTTPError)
+
+def _get_json(url, params=None):
+    response = get_http_session().get(url, params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+# JSON GET 요청 함수 (일시적인 네트워크/서버 오류는 재시도)
+get_json = retry_with_backoff(HTTP_RETRY_EXCEPTIONS)(_get_json)
+# 검색 화면에서 여러 요청을 기다리는 미리 가져오기용 (재시도 횟수와 대기 시간을 줄여 화면이 오래 막히지 않도록 함)
+get_json_prefetch = retry_with_backoff(HTTP_RETRY_EXCEPTIONS, max_retries=2, cap=5.0)(_get_json)
 
 # 캐시된 get_api_foods 함수
 @st.cache_data(ttl=3600)  # 1시간 동안 캐시
@@ -314,35 +520,9 @@ def get_api_foods_cached(page=1, page_size=10):  # 기본 page_size를 10으로
     }
     try:
         start_time = time.time()
-        response = session_requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = get_json(url, params=params)
         products = data.get('products', [])
-        translated_products = []
-        for product in products:
-            barcode = product.get('code', '바코드 없음')
-            if barcode != '바코드 없음':
-                product_name_korean = product.get('product_name_KR')
-                if product_name_korean:
-                    name = product_name_korean
-                else:
-                    product_name = product.get('product_name')
-                    if (product_name):
-                        name = translate_to_korean_cached(product_name, barcode=barcode)
-                    else:
-                        name = '이름 없음'
-            else:
-                product_name = product.get('product_name')
-                if product_name:
-                    name = translate_to_korean_cached(product_name)
-                else:
-                    name = '이름 없음'
-            translated_products.append({
-                '제품 이름': name,
-                '바코드': barcode,
-                '제조사': ", ".join(product.get('brands', '제조사 없음').split(',')),
-                '카테고리': ", ".join(product.get('categories', '카테고리 없음').split(','))
-            })
+        translated_products = build_product_rows(products, translate_product_names(products))
         end_time = time.time()
         logger.info(f"get_api_foods_cached 실행 시간: {end_time - start_time}초")
         return translated_products
@@ -389,7 +569,7 @@ def search_food(query, max_retries=3, backoff_factor=0.3):
     for attempt in range(max_retries):
         try:
             start_time = time.time()
-            response = session_requests.get(url, params=params, timeout=10)
+            response = get_http_session().get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             end_time = time.time()
@@ -410,23 +590,84 @@ def search_food(query, max_retries=3, backoff_factor=0.3):
     st.error("음식 검색에 실패했습니다. 나중에 다시 시도해주세요.")
     return []
 
+# 영양 정보 요청용 스레드 풀 (여러 바코드를 동시에 조회, 프로세스당 하나만 생성)
+@st.cache_resource
+def get_nutrition_pool():
+    return ThreadPoolExecutor(max_workers=16)
+
+# OpenFoodFacts 제품 정보에서 영양 정보 추출 함수
+def parse_nutrition_info(product):
+    nutriments = product.get('nutriments', {})
+    return {
+        'name': product.get('product_name', '이름 없음'),
+        'calories': float(nutriments.get('energy-kcal_100g', 0)),
+        'proteins': float(nutriments.get('proteins_100g', 0)),
+        'carbs': float(nutriments.get('carbohydrates_100g', 0)),
+        'fats': float(nutriments.get('fat_100g', 0)),
+    }
+
+# 영양 정보 요청 함수 (오류는 호출한 쪽에서 처리)
+def fetch_nutrition_info(barcode, fetch_json=get_json):
+    url = f'https://world.openfoodfacts.org/api/v0/product/{barcode}.json'
+    data = fetch_json(url)
+    if data.get('status') != 1:
+        return {}
+    return parse_nutrition_info(data.get('product', {}))
+
+# 여러 바코드의 영양 정보를 한 번의 요청으로 가져오는 함수 ({바코드: 영양 정보} 반환)
+@st.cache_data(ttl=3600, show_spinner=False)  # 1시간 동안 캐시
+def get_nutrition_info_bulk(barcodes):
+    url = 'https://world.openfoodfacts.org/api/v2/search'
+    params = {
+        'code': ','.join(barcodes),
+        'fields': 'code,product_name,nutriments',  # 필요한 필드만 요청
+        'page_size': len(barcodes)
+    }
+    data = get_json(url, params=params)
+    return {
+        product['code']: parse_nutrition_info(product)
+        for product in data.get('products', []) if product.get('code')
+    }
+
+# 캐시된 영양 정보 요청 함수 (요청이 실패하면 예외가 발생하므로 오류는 캐시되지 않음)
+@st.cache_data(ttl=3600, show_spinner=False)  # 1시간 동안 캐시
+def fetch_nutrition_info_cached(barcode):
+    return fetch_nutrition_info(barcode)
+
+# 미리 가져오기용 캐시된 개별 요청 함수 (일괄 결과에 없는 바코드용)
+# 제품이 없는 바코드의 빈 결과({})도 캐시하여 검색할 때마다 다시 요청하지 않음 (요청 실패는 예외이므로 캐시되지 않음)
+@st.cache_data(ttl=3600, show_spinner=False)  # 1시간 동안 캐시
+def fetch_nutrition_info_prefetch(barcode):
+    return fetch_nutrition_info(barcode, fetch_json=get_json_prefetch)
+
+# 여러 바코드의 영양 정보를 미리 가져오는 함수
+# 한 번의 일괄 요청으로 먼저 가져오고, 결과에 없는 바코드만 스레드 풀에서 동시에 개별 요청
+def prefetch_nutrition_info(barcodes):
+    barcodes = sorted(set(barcodes))
+    if not barcodes:
+        return {}
+    nutrition_by_barcode = {}
+    try:
+        nutrition_by_barcode.update(get_nutrition_info_bulk(tuple(barcodes)))
+    except Exception as e:
+        logger.error(f"영양 정보 일괄 요청 중 오류 발생: {e}")
+    missing_barcodes = [barcode for barcode in barcodes if barcode not in nutrition_by_barcode]
+    pool = get_nutrition_pool()
+    futures = {pool.submit(fetch_nutrition_info_prefetch, barcode): barcode for barcode in missing_barcodes}
+    for future in as_completed(futures):
+        barcode = futures[future]
+        try:
+            nutrition = future.result()
+            if nutrition:
+                nutrition_by_barcode[barcode] = nutrition
+        except Exception as e:
+            logger.error(f"영양 정보 미리 가져오기 중 오류 발생 ({barcode}): {e}")
+    return nutrition_by_barcode
+
 # 영양 정보 가져오기 함수 (식단 관리용)
 def get_nutrition_info(barcode):
-    url = f'https://world.openfoodfacts.org/api/v0/product/{barcode}.json'
     try:
-        response = session_requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('status') == 1:
-            product = data.get('product', {})
-            nutriments = product.get('nutriments', {})
-            return {
-                'name': product.get('product_name', '이름 없음'),
-                'calories': float(nutriments.get('energy-kcal_100g', 0)),
-                'proteins': float(nutriments.get('proteins_100g', 0)),
-                'carbs': float(nutriments.get('carbohydrates_100g', 0)),
-                'fats': float(nutriments.get('fat_100g', 0)),
-            }
+        return fetch_nutrition_info_cached(barcode)
     except (ChunkedEncodingError, ConnectionError, Timeout) as e:
         logger.error(f"영양 정보 요청 중 오류 발생: {e}")
         st.error(f"영양 정보 요청 중 오류 발생: {e}")
@@ -505,44 +746,34 @@ def reset_session_state():
 def reset_database_tables():
     session = Session_db()
     try:
+        # 두 DELETE는 하나의 트랜잭션으로 실행되고 한 번만 커밋됩니다.
+        # 삭제 후 세션의 객체를 다시 사용하지 않으므로 identity map 동기화는 생략합니다.
         # 특정 사용자에 대한 모든 Meal 데이터 삭제
-        deleted_meals = session.query(Meal).filter_by(user_id=st.session_state.user_id).delete()
+        session.query(Meal).filter_by(user_id=st.session_state.user_id).delete(synchronize_session=False)
         # 특정 사용자에 대한 모든 ManualMeal 데이터 삭제
-        deleted_manual_meals = session.query(ManualMeal).filter_by(user_id=st.session_state.user_id).delete()
-        # 모든 ProductTranslation 데이터 삭제 (필요에 따라 조건 추가 가능)
-        deleted_translations = session.query(ProductTranslation).delete()
+        session.query(ManualMeal).filter_by(user_id=st.session_state.user_id).delete(synchronize_session=False)
+        # ProductTranslation은 모든 사용자가 공유하는 번역 캐시이므로 삭제하지 않습니다.
         session.commit()
+        invalidate_meal_cache()
         st.success("모든 식단 데이터가 삭제되었습니다.")
         st.rerun()
     except Exception as e:
         session.rollback()
         st.error(f"데이터 삭제 중 오류가 발생했습니다: {e}")
-    finally:
-        session.close()
 
 # 데이터 백업 함수 (JSON 형식만 지원)
 def backup_data(user_id, format='json'):
     session = Session_db()
     try:
-        # Meals 데이터
-        meals = session.query(Meal).filter_by(user_id=user_id).all()
-        meals_data = [{
-            'id': meal.id,
-            'name': meal.name,
-            'calories': meal.calories,
-            'proteins': meal.proteins,
-            'carbs': meal.carbs,
-            'fats': meal.fats,
-            'date': meal.date.strftime('%Y-%m-%d %H:%M:%S')
-        } for meal in meals]
+        # Meals 데이터 (ORM 객체 없이 필요한 컬럼만 조회하여 바로 dict로 변환)
+        meals_data = [
+            dict(row) for row in session.execute(MEALS_BY_USER_QUERY, {'user_id': user_id}).mappings()
+        ]
 
         # ManualMeals 데이터
-        manual_meals = session.query(ManualMeal).filter_by(user_id=user_id).all()
-        manual_meals_data = [{
-            'id': manual_meal.id,
-            'name': manual_meal.name,
-            'date': manual_meal.date.strftime('%Y-%m-%d %H:%M:%S')
-        } for manual_meal in manual_meals]
+        manual_meals_data = [
+            dict(row) for row in session.execute(MANUAL_MEALS_BY_USER_QUERY, {'user_id': user_id}).mappings()
+        ]
 
         backup = {
             'meals': meals_data,
@@ -550,91 +781,96 @@ def backup_data(user_id, format='json'):
         }
 
         if format == 'json':
-            backup_json = json.dumps(backup, ensure_ascii=False, indent=4)
-            return backup_json.encode('utf-8')
+            # orjson은 datetime을 ISO 8601 문자열로 직접 직렬화하고 UTF-8 bytes를 반환합니다.
+            return orjson.dumps(backup, option=orjson.OPT_INDENT_2 | orjson.OPT_OMIT_MICROSECONDS)
     except Exception as e:
         st.error(f"백업 중 오류 발생: {e}")
         return None
-    finally:
-        session.close()
+
+# 복원 시 한 번에 삽입할 행 수
+RESTORE_BATCH_SIZE = 1000
+
+# 행들을 batch_size개씩 나누어 executemany로 삽입하는 함수
+def insert_in_batches(session, model, rows, batch_size=RESTORE_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        session.execute(insert(model), batch)
 
 # 데이터 복원 함수 (JSON 형식만 지원)
 def restore_data(user_id, file, format='json'):
     session = Session_db()
     try:
-        if format == 'json':
-            data = json.load(io.StringIO(file.getvalue().decode("utf-8")))
-        else:
+        if format != 'json':
             st.error("지원하지 않는 파일 형식입니다.")
             return False
 
-        # 복원할 데이터
-        meals = data.get('meals', [])
-        manual_meals = data.get('manual_meals', [])
-
-        # Meals 데이터 삽입
-        for meal in meals:
-            new_meal = Meal(
-                user_id=user_id,
-                name=meal['name'],
-                calories=meal.get('calories', 0.0),
-                proteins=meal.get('proteins', 0.0),
-                carbs=meal.get('carbs', 0.0),
-                fats=meal.get('fats', 0.0),
-                date=datetime.strptime(meal['date'], '%Y-%m-%d %H:%M:%S')
-            )
-            session.add(new_meal)
-
-        # ManualMeals 데이터 삽입
-        for manual_meal in manual_meals:
-            new_manual_meal = ManualMeal(
-                user_id=user_id,
-                name=manual_meal['name'],
-                date=datetime.strptime(manual_meal['date'], '%Y-%m-%d %H:%M:%S')
-            )
-            session.add(new_manual_meal)
+        # 파일 전체를 메모리에 올리지 않고 항목 단위로 읽으면서 일괄 삽입
+        # Meals 데이터
+        meal_rows = ({
+            'user_id': user_id,
+            'name': meal['name'],
+            'calories': meal.get('calories', 0.0),
+            'proteins': meal.get('proteins', 0.0),
+            'carbs': meal.get('carbs', 0.0),
+            'fats': meal.get('fats', 0.0),
+            'date': datetime.fromisoformat(meal['date'])  # 이전 '%Y-%m-%d %H:%M:%S' 형식도 지원
+        } for meal in ijson.items(file, 'meals.item', use_float=True))
+        insert_in_batches(session, Meal, meal_rows)
+
+        # ManualMeals 데이터 (파일을 처음부터 다시 읽음)
+        file.seek(0)
+        manual_meal_rows = ({
+            'user_id': user_id,
+            'name': manual_meal['name'],
+            'date': datetime.fromisoformat(manual_meal['date'])
+        } for manual_meal in ijson.items(file, 'manual_meals.item', use_float=True))
+        insert_in_batches(session, ManualMeal, manual_meal_rows)
 
         session.commit()
+        invalidate_meal_cache()
         st.success("데이터 복원이 완료되었습니다.")
         st.rerun()
         return True
-    except json.JSONDecodeError:
+    except ijson.JSONError:
+        session.rollback()
         st.error("업로드한 파일이 유효한 JSON 파일이 아닙니다.")
         return False
     except Exception as e:
         session.rollback()
         st.error(f"복원 중 오류 발생: {e}")
         return False
-    finally:
-        session.close()
 
 # 음식 삭제 UI (식단 입력과 관리에서 별도로 구현)
-def delete_meal_ui(meals_sorted):
+def delete_meal_ui(meal_items):
     st.markdown("---")
     st.subheader("음식 삭제")
 
-    # 삭제할 음식 ID 선택
-    meal_ids = [meal.id for meal in meals_sorted]
-    meal_names = [meal.name for meal in meals_sorted]
-    meal_options = [f"ID {id_} - {name}" for id_, name in zip(meal_ids, meal_names)]
-    selected_meal = st.selectbox("삭제할 음식을 선택하세요:", options=meal_options, key='selected_meal_delete')
+    # 삭제할 음식 ID 선택 (meal_items는 (ID, 이름) 쌍의 목록, 여러 개를 골라 한 번에 삭제)
+    meal_labels = {int(id_): f"ID {id_} - {name}" for id_, name in meal_items}
+    with st.form("delete_meals_form"):
+        selected_ids = st.multiselect(
+            "삭제할 음식을 선택하세요:",
+            options=list(meal_labels),
+            format_func=meal_labels.get,
+            key='selected_meal_delete'
+        )
+        submitted = st.form_submit_button("삭제 실행")
 
-    if selected_meal:
-        # 선택된 문자열에서 ID 추출
-        try:
-            selected_id = int(selected_meal.split(" - ")[0].replace("ID ", ""))
-        except ValueError:
-            st.error("잘못된 선택입니다.")
+    if submitted:
+        if not selected_ids:
+            st.warning("삭제할 음식을 선택하세요.")
             return
-
-        if st.button("삭제 실행"):
-            success = delete_meal(st.session_state.user_id, selected_id)
-            if success:
-                st.success(f"ID {selected_id} 음식이 삭제되었습니다.")
-                # 삭제 후 페이지를 새로 고침하거나 상태를 업데이트할 필요가 있을 수 있습니다.
-                st.rerun()
-            else:
-                st.error("해당 ID의 음식을 찾을 수 없습니다.")
+        deleted_count = delete_meals(st.session_state.user_id, selected_ids)
+        if deleted_count:
+            st.success(f"{deleted_count}개 음식이 삭제되었습니다.")
+            st.rerun()
+        else:
+            st.error("해당 ID의 음식을 찾을 수 없습니다.")
 
 # 데이터 백업 및 복원 UI 함수 (사이드바로 이동, JSON만 지원)
 def backup_restore_sidebar():
@@ -675,13 +911,33 @@ def backup_restore_sidebar():
             else:
                 st.sidebar.error("데이터 복원에 실패했습니다.")
 
+# 섭취 기록 한 페이지에 표시할 음식 수
+MEALS_PAGE_SIZE = 20
+
+# 섭취 기록 정렬 기준과 정렬 순서
+SORT_OPTIONS = {
+    "ID": Meal.id,
+    "이름": Meal.name,
+    "칼로리": Meal.calories,
+    "단백질": Meal.proteins,
+    "탄수화물": Meal.carbs,
+    "지방": Meal.fats
+}
+SORT_ORDERS = {"오름차순": asc, "내림차순": desc}
+
+# 섭취 기록 표의 컬럼 이름 (DB 컬럼 -> 화면 표시 이름)
+MEAL_TABLE_COLUMNS = {
+    'id': 'ID',
+    'name': '이름',
+    'calories': '칼로리',
+    'proteins': '단백질 (g)',
+    'carbs': '탄수화물 (g)',
+    'fats': '지방 (g)'
+}
+MEAL_NUTRIENT_COLUMNS = ['칼로리', '단백질 (g)', '탄수화물 (g)', '지방 (g)']
+
 # 기존 식단 관리 페이지를 업데이트하여 섭취 기록을 DataFrame으로 표시하고 삭제 기능 추가
 def manage_meals():
-    # user_id가 존재하는지 확인
-    if not st.session_state.get('user_id'):
-        st.error("사용자 정보가 누락되었습니다. 다시 로그인 해주세요.")
-        return
-
     st.header("건강 식단 관리 플랫폼")
     st.subheader("API를 통한 음식 검색 및 추가")
 
@@ -698,18 +954,14 @@ def manage_meals():
                     products = search_food(search_query.strip())
                     if products:
                         # 음식 이름과 관련 정보를 추출
-                        products_filtered = [
-                            {
-                                '제품 이름': product.get('product_name_KR') or translate_to_korean_cached(product.get('product_name', '이름 없음'), barcode=product.get('code', None)),
-                                '바코드': product.get('code', '바코드 없음'),
-                                '제조사': ", ".join(product.get('brands', '제조사 없음').split(',')),
-                                '카테고리': ", ".join(product.get('categories', '카테고리 없음').split(','))
-                            }
-                            for product in products if product.get('product_name') or product.get('product_name_KR')
-                        ]
+                        products = [product for product in products if product.get('product_name') or product.get('product_name_KR')]
+                        products_filtered = build_product_rows(products, translate_product_names(products))
                         if products_filtered:
-                            # 검색 결과를 세션 상태에 저장
+                            # 검색 결과와 미리 가져온 영양 정보를 세션 상태에 저장
                             st.session_state['search_results_manage'] = products_filtered
+                            st.session_state['nutrition_info_manage'] = prefetch_nutrition_info(
+                                [product['바코드'] for product in products_filtered if product['바코드'] != '바코드 없음']
+                            )
                             st.success(f"{len(products_filtered)}개의 검색 결과를 찾았습니다.")
                         else:
                             st.info("검색 결과에 음식 이름이 없습니다.")
@@ -731,7 +983,7 @@ def manage_meals():
                 barcode = selected_product_info.get('바코드', '')
                 
                 if (barcode and barcode != '바코드 없음'):
-                    nutrition = get_nutrition_info(barcode)
+                    nutrition = st.session_state['nutrition_info_manage'].get(barcode) or get_nutrition_info(barcode)
                     if nutrition:
                         st.write(f"**제품 이름:** {nutrition.get('name', '이름 없음')}")
                         st.write(f"**칼로리:** {nutrition.get('calories', 0)} kcal")
@@ -754,6 +1006,7 @@ def manage_meals():
                 # 저장 후 선택된 영양 정보와 검색 결과를 초기화
                 st.session_state['selected_nutrition_manage'] = None
                 st.session_state['search_results_manage'] = []
+                st.session_state['nutrition_info_manage'] = {}
                 st.rerun()
             else:
                 st.error("음식 저장에 실패했습니다.")
@@ -784,8 +1037,8 @@ def manage_meals():
 
     if api_foods:
         st.subheader(f"전체 API 음식 목록 (페이지 {st.session_state.api_foods_page})")
-        df_api = pd.DataFrame(api_foods)
-        st.dataframe(df_api)
+        # 레코드 목록을 pandas를 거치지 않고 Arrow 테이블로 바로 변환
+        st.dataframe(pa.Table.from_pylist(api_foods))
 
         # 페이지네이션 버튼
         col1, col2, col3 = st.columns([1, 2, 1])
@@ -808,16 +1061,8 @@ def manage_meals():
     st.header("섭취 기록")
     
     # 정렬 기준 선택
-    sort_options = {
-        "ID": Meal.id,
-        "이름": Meal.name,
-        "칼로리": Meal.calories,
-        "단백질": Meal.proteins,
-        "탄수화물": Meal.carbs,
-        "지방": Meal.fats
-    }
-    sort_by = st.selectbox("정렬 기준 선택", options=list(sort_options.keys()), key='sort_by_manage')
-    sort_order = st.radio("정렬 순서", options=["오름차순", "내림차순"], key='sort_order_manage')
+    sort_by = st.selectbox("정렬 기준 선택", options=list(SORT_OPTIONS), key='sort_by_manage')
+    sort_order = st.radio("정렬 순서", options=list(SORT_ORDERS), key='sort_order_manage')
 
     # 데이터베이스 세션 설정
     session_db = Session_db()
@@ -825,45 +1070,43 @@ def manage_meals():
     # 검색어 입력
     search_query_record = st.text_input("검색할 음식 이름을 입력하세요:", key='search_query_record')
 
-    # 선택된 기준에 따라 정렬 및 검색어에 따라 필터링
-    query = session_db.query(Meal).filter_by(user_id=st.session_state.user_id)
+    # 선택된 기준에 따라 정렬 및 검색어에 따라 필터링 (ORM 객체 없이 필요한 컬럼만 조회)
+    filters = [Meal.user_id == st.session_state.user_id]
     if search_query_record:
-        query = query.filter(Meal.name.contains(search_query_record))
-
-    if sort_order == "오름차순":
-        meals_sorted = query.order_by(asc(sort_options[sort_by])).all()
-    else:
-        meals_sorted = query.order_by(desc(sort_options[sort_by])).all()
-
-    if meals_sorted:
-        # 데이터프레임 생성
-        data = {
-            'ID': [meal.id for meal in meals_sorted],
-            '이름': [meal.name for meal in meals_sorted],
-            '칼로리': [meal.calories for meal in meals_sorted],
-            '단백질 (g)': [meal.proteins for meal in meals_sorted],
-            '탄수화물 (g)': [meal.carbs for meal in meals_sorted],
-            '지방 (g)': [meal.fats for meal in meals_sorted]
-            # '날짜': [meal.date.strftime('%Y-%m-%d %H:%M:%S') for meal in meals_sorted]  # 삭제
-        }
-        df = pd.DataFrame(data)
+        filters.append(Meal.name.contains(search_query_record))
+    stmt = select(Meal.id, Meal.name, Meal.calories, Meal.proteins, Meal.carbs, Meal.fats).where(*filters)
+    # 정렬 기준 값이 같은 행의 순서가 페이지마다 달라지지 않도록 ID를 보조 정렬 기준으로 사용
+    stmt = stmt.order_by(SORT_ORDERS[sort_order](SORT_OPTIONS[sort_by]), Meal.id)
+
+    # 페이지 단위로 조회하여 기록이 많아도 한 페이지 분량만 가져오고 화면에 전송
+    total_meals = session_db.execute(select(func.count(Meal.id)).where(*filters)).scalar()
+    total_pages = max(1, math.ceil(total_meals / MEALS_PAGE_SIZE))
+    if st.session_state.get('meals_page', 1) > total_pages:
+        st.session_state.meals_page = total_pages  # 삭제나 검색으로 페이지 수가 줄어든 경우
+    # 위젯 인자가 바뀌면 새 위젯으로 취급되어 1페이지로 돌아가므로, 라벨은 고정하고 최대값은 직접 제한
+    page = min(st.number_input("페이지", min_value=1, step=1, key='meals_page'), total_pages)
+    st.caption(f"전체 {total_pages}페이지, {total_meals}개")
+    stmt = stmt.limit(MEALS_PAGE_SIZE).offset((page - 1) * MEALS_PAGE_SIZE)
+
+    # 데이터프레임 생성 (DB 커서에서 바로 컬럼 단위로 생성)
+    df = pd.read_sql_query(stmt, session_db.connection()).rename(columns=MEAL_TABLE_COLUMNS)
+    # 영양 정보가 없는 값은 0으로 채우고 숫자 컬럼을 작은 고정 타입으로 지정 (object 컬럼 방지)
+    df[MEAL_NUTRIENT_COLUMNS] = df[MEAL_NUTRIENT_COLUMNS].fillna(0).astype('float32')
+    df = df.astype({'ID': 'int32'})
+
+    if not df.empty:
         st.dataframe(df)
 
-        # 삭제할 음식 선택
-        delete_meal_ui(meals_sorted)
+        # 삭제할 음식 선택 (이미 조회한 ID와 이름을 사용하므로 추가 쿼리 없음, 현재 표시된 페이지의 음식만 삭제 가능)
+        # 삭제 후에도 meals_page 값은 유지되고, 마지막 페이지가 비면 위의 보정으로 새 마지막 페이지로 이동
+        delete_meal_ui(zip(df['ID'], df['이름']))
 
     else:
         st.info("섭취 기록이 없습니다.")
 
-    session_db.close()
 
 # 새로운 식단 입력 페이지
 def meal_input_page():
-    # user_id가 존재하는지 확인
-    if not st.session_state.get('user_id'):
-        st.error("사용자 정보가 누락되었습니다. 다시 로그인 해주세요.")
-        return
-
     st.header("식단 입력")
 
     # 음식 입력 폼
@@ -888,9 +1131,13 @@ def meal_input_page():
 
     st.markdown("---")
     st.subheader("저장된 식단")
+    saved_manual_meals(st.session_state.user_id)
 
-    # 저장된 수동 식단 표시 및 삭제
-    manual_meals = get_manual_meals(st.session_state.user_id)
+# 저장된 수동 식단 표시 및 삭제 (fragment로 분리하여 삭제 시 이 목록만 다시 실행)
+@st.fragment
+@release_db_session
+def saved_manual_meals(user_id):
+    manual_meals = get_manual_meals(user_id)
     if manual_meals:
         for manual_meal in manual_meals:
             with st.container():
@@ -900,60 +1147,50 @@ def meal_input_page():
                 with col2:
                     delete_button = st.button("삭제", key=f"delete_manual_{manual_meal.id}")
                     if delete_button:
-                        success = delete_manual_meal(st.session_state.user_id, manual_meal.id)
+                        success = delete_manual_meal(user_id, manual_meal.id)
                         if success:
                             st.success(f"{manual_meal.name} 음식이 삭제되었습니다.")
-                            st.rerun()
+                            st.rerun(scope="fragment")
                         else:
                             st.error("해당 음식을 찾을 수 없습니다.")
     else:
         st.info("저장된 식단이 없습니다.")
 
+# 하루 목표 섭취량 (예시 값)
+NUTRITION_TARGETS = {'calories': 2200, 'proteins': 60, 'carbs': 130, 'fats': 51}
+# 달성률 막대로 표시할 영양소 (표시 이름, NUTRITION_TARGETS 키)
+PROGRESS_NUTRIENTS = (("탄수화물", 'carbs'), ("단백질", 'proteins'), ("지방", 'fats'))
+PROGRESS_TARGETS = np.array([NUTRITION_TARGETS[key] for _, key in PROGRESS_NUTRIENTS], dtype=np.float32)
+
 # 하루 통계 및 챗봇 피드백
 def show_statistics_with_chatbot(chatbot):
-    # 목표 설정 (예시 값)
-    target_carbs = 130
-    target_proteins = 60
-    target_fats = 51
-    total_calories = 2200
-
-    # user_id가 존재하는지 확인
-    if not st.session_state.get('user_id'):
-        st.error("사용자 정보가 누락되었습니다. 다시 로그인 해주세요.")
-        return
-
-    # 식단 관리용 데이터
-    meals = get_diets(st.session_state.user_id)
-    current_carbs = sum([meal.carbs or 0 for meal in meals])
-    current_proteins = sum([meal.proteins or 0 for meal in meals])
-    current_fats = sum([meal.fats or 0 for meal in meals])
-    current_calories = sum([meal.calories or 0 for meal in meals])
+    # 식단 관리용 데이터 (합계는 SQL에서 한 번에 계산)
+    current_calories, current_proteins, current_carbs, current_fats = get_diet_totals(st.session_state.user_id)
+    current = {'calories': current_calories, 'proteins': current_proteins, 'carbs': current_carbs, 'fats': current_fats}
 
     # 통계 요약에서 수동 식단 개수 제거
     statistics_summary = (
-        f"현재 칼로리는 {current_calories} kcal입니다. 목표는 {total_calories} kcal입니다.\n"
-        f"단백질: {current_proteins}g / {target_proteins}g\n"
-        f"탄수화물: {current_carbs}g / {target_carbs}g\n"
-        f"지방: {current_fats}g / {target_fats}g"
+        f"현재 칼로리는 {current_calories} kcal입니다. 목표는 {NUTRITION_TARGETS['calories']} kcal입니다.\n"
+        f"단백질: {current_proteins}g / {NUTRITION_TARGETS['proteins']}g\n"
+        f"탄수화물: {current_carbs}g / {NUTRITION_TARGETS['carbs']}g\n"
+        f"지방: {current_fats}g / {NUTRITION_TARGETS['fats']}g"
     )
 
     st.title("하루 통계")
-    st.metric(label="칼로리", value=f"{current_calories} / {total_calories} kcal")
+    st.metric(label="칼로리", value=f"{current_calories} / {NUTRITION_TARGETS['calories']} kcal")
 
-    st.write("탄수화물")
-    progress_carbs = current_carbs / target_carbs if target_carbs else 0
-    st.progress(progress_carbs if progress_carbs <= 1 else 1)
-    st.write(f"{current_carbs}g / {target_carbs}g")
-
-    st.write("단백질")
-    progress_proteins = current_proteins / target_proteins if target_proteins else 0
-    st.progress(progress_proteins if progress_proteins <= 1 else 1)
-    st.write(f"{current_proteins}g / {target_proteins}g")
+    # 달성률을 한 번에 계산 (목표가 0이면 0, 최대 1로 제한)
+    cur = np.array([current[key] for _, key in PROGRESS_NUTRIENTS], dtype=np.float32)
+    progress = np.clip(
+        np.divide(cur, PROGRESS_TARGETS, out=np.zeros_like(cur), where=PROGRESS_TARGETS != 0), 0, 1
+    )
 
-    st.write("지방")
-    progress_fats = current_fats / target_fats if target_fats else 0
-    st.progress(progress_fats if progress_fats <= 1 else 1)
-    st.write(f"{current_fats}g / {target_fats}g")
+    # 세 영양소의 달성률을 한 줄에 나란히 표시
+    for column, (label, key), ratio in zip(st.columns(len(PROGRESS_NUTRIENTS)), PROGRESS_NUTRIENTS, progress):
+        with column:
+            st.write(label)
+            st.progress(float(ratio))
+            st.write(f"{current[key]}g / {NUTRITION_TARGETS[key]}g")
 
     st.markdown("---")
 
@@ -967,7 +1204,12 @@ def show_statistics_with_chatbot(chatbot):
 def chatbot_tab(chatbot):
     st.header("🛜 영양 상담 챗봇 🤖")
     st.write("챗봇과 대화를 통해 영양 정보에 대해 물어보세요!")
+    chatbot_conversation(chatbot)
 
+# 챗봇 대화 기록 및 입력 (fragment로 분리하여 메시지를 보낼 때 사이드바와 백업 데이터를 다시 만들지 않음)
+@st.fragment
+@release_db_session
+def chatbot_conversation(chatbot):
     if "chatbot_messages" not in st.session_state:
         st.session_state.chatbot_messages = [
             {"role": "assistant", "content": "안녕하세요! 저는 영양 상담 챗봇입니다. 무엇을 도와드릴까요?"}
@@ -992,6 +1234,7 @@ def logout():
     st.session_state.user_id = None
     st.session_state.page = 'start'
     st.session_state.chatbot_messages = []
+    st.session_state.pop('chatbot_session', None)
     st.sidebar.success("로그아웃 되었습니다.")
     st.rerun()
 
@@ -1012,6 +1255,13 @@ def show_start_page():
 
 # 메인 애플리케이션 함수
 def main_app(chatbot):
+    # user_id가 존재하는지 한 번만 확인하고, 없으면 로그인 화면으로 돌려보낸 뒤 나머지 실행을 중단
+    if not st.session_state.get('user_id'):
+        st.error("사용자 정보가 누락되었습니다. 다시 로그인 해주세요.")
+        st.session_state.logged_in = False
+        st.session_state.page = 'login'
+        st.stop()
+
     st.sidebar.header(f"{st.session_state.username}님")
     # 메뉴 선택에서 "식단 입력"을 먼저, "식단 관리"를 나중으로 변경
     choice = st.sidebar.selectbox("메뉴 선택", ["식단 입력", "식단 관리", "하루 통계", "챗봇", "로그아웃"])
@@ -1056,10 +1306,9 @@ def main_app(chatbot):
         logout()
 
 # 메인 함수
+@release_db_session
 def main():
     initialize_app()  # 세션 상태 초기화
-    counseling_data = []
-    chatbot = Chatbot(counseling_data)
 
     if not st.session_state.get('logged_in', False):
         if st.session_state.get('page', 'start') == 'login':
@@ -1069,7 +1318,9 @@ def main():
         elif st.session_state.get('page') == 'start':
             show_start_page()
     else:
-        main_app(chatbot)
+        # 챗봇 모듈(토크나이저, OpenAI API 키)은 로그인한 뒤에만 불러옴
+        from chatbot import get_chatbot
+        main_app(get_chatbot())
 
 # 초기화 함수
 def initialize_app():
@@ -1088,10 +1339,14 @@ def initialize_app():
         st.session_state.selected_nutrition_input = None
     if 'search_results_manage' not in st.session_state:
         st.session_state.search_results_manage = []
+    if 'nutrition_info_manage' not in st.session_state:
+        st.session_state.nutrition_info_manage = {}
     if 'api_foods_page' not in st.session_state:
         st.session_state.api_foods_page = 1
     if 'api_foods_page_size' not in st.session_state:
         st.session_state.api_foods_page_size = 10  # 페이지 당 음식 수를 10으로
+    if 'meals_page' not in st.session_state:
+        st.session_state.meals_page = 1
     if 'chatbot_messages' not in st.session_state:
         st.session_state.chatbot_messages = []
 
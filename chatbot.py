@@ -0,0 +1,100 @@
+# chatbot.py
+
+import asyncio
+import aiohttp
+import streamlit as st
+import tiktoken
+from retry import retry_with_backoff
+
+# OpenAI API 키 설정
+API_KEY = st.secrets["OPENAI_API_KEY"]
+OPENAI_CHAT_URL = 'https://api.openai.com/v1/chat/completions'
+
+# 대화 기록의 최대 토큰 수 (초과하면 오래된 메시지부터 제거)
+MAX_CONVERSATION_TOKENS = 3000
+MESSAGE_OVERHEAD_TOKENS = 4  # 메시지마다 붙는 역할/구분자 토큰
+
+# 모델별 토크나이저 (프로세스당 한 번만 로드)
+@st.cache_resource
+def get_token_encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+# 첫 시스템 프롬프트와 토큰 한도 안에 드는 최근 메시지만 남기는 함수 (conversation을 직접 수정)
+def trim_conversation(conversation, encoding, max_tokens=MAX_CONVERSATION_TOKENS):
+    budget = max_tokens - len(encoding.encode(conversation[0]["content"])) - MESSAGE_OVERHEAD_TOKENS
+    keep = 0
+    for message in reversed(conversation[1:]):
+        budget -= len(encoding.encode(message["content"])) + MESSAGE_OVERHEAD_TOKENS
+        if budget < 0:
+            break
+        keep += 1
+    keep = max(keep, 1)  # 가장 최근 메시지는 항상 유지
+    del conversation[1:len(conversation) - keep]
+
+# Chatbot 클래스 정의
+class Chatbot:
+    def __init__(self, counseling_data, model="gpt-3.5-turbo"):
+        self.counseling_data = counseling_data
+        self.initial_question = "Hello! I am a Chatbot."
+        self.model = model
+        self.encoding = get_token_encoding(model)
+
+    # 대화 기록은 사용자별로 st.session_state에 저장 (캐시된 인스턴스는 모든 사용자가 공유하므로 인스턴스에 저장하지 않음)
+    @property
+    def current_session(self):
+        if 'chatbot_session' not in st.session_state:
+            st.session_state.chatbot_session = [{"role": "system", "content": "You are a helpful counseling assistant."}]
+        return st.session_state.chatbot_session
+
+    def _add_message(self, role, content):
+        self.current_session.append({"role": role, "content": content})
+        trim_conversation(self.current_session, self.encoding)
+
+    async def _post_chat_completion(self, conversation):
+        timeout = aiohttp.ClientTimeout(total=60)
+        connector = aiohttp.TCPConnector(limit=100, keepalive_timeout=60)
+        headers = {"Authorization": f"Bearer {API_KEY}"}
+        payload = {"model": self.model, "messages": conversation}
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            async with session.post(OPENAI_CHAT_URL, headers=headers, json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+        return data["choices"][0]["message"]["content"]
+
+    @retry_with_backoff((aiohttp.ClientResponseError, aiohttp.ClientConnectionError, asyncio.TimeoutError))
+    def _create_chat_completion(self, conversation):
+        return asyncio.run(self._post_chat_completion(conversation))
+
+    def get_openai_response(self, conversation):
+        try:
+            return self._create_chat_completion(conversation)
+        except aiohttp.ClientResponseError as e:
+            if e.status == 429:
+                return "현재 서비스 이용량이 초과되었습니다. 잠시 후 다시 시도해주세요."
+            return f"오류가 발생했습니다: {e}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return f"오류가 발생했습니다: {e}"
+
+    def chat(self, user_input=None):
+        if user_input:
+            self._add_message("user", user_input)
+        conversation = self.current_session
+        response = self.get_openai_response(conversation)
+        self._add_message("assistant", response)
+        return response
+
+    def provide_feedback(self, statistics_summary):
+        self._add_message("system", f"Here is today's nutrition summary: {statistics_summary}")
+        user_input = "오늘 섭취량에 대해 어떻게 생각하나요?"
+        self._add_message("user", user_input)
+        response = self.get_openai_response(self.current_session)
+        self._add_message("assistant", response)
+        return response
+
+# 챗봇 생성 함수 (프로세스당 한 번만 생성, 반환된 인스턴스는 변경하지 않음)
+@st.cache_resource
+def get_chatbot(counseling_data=()):
+    return Chatbot(list(counseling_data))
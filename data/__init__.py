@@ -1,3 +1,3 @@
 # data/__init__.py
 
-from .database import create_user, get_user, verify_password, add_diet, get_diets, delete_meal, login_user, initialize_database
+from .database import create_user, get_user, verify_password, add_diet, get_diets, get_diet_totals, delete_meal, delete_meals, login_user, initialize_database
@@ -1,112 +1,149 @@
 # data/database.py
 
-from sqlalchemy import create_engine
+from typing import NamedTuple
+from sqlalchemy import create_engine, delete, event, func
 from sqlalchemy.orm import sessionmaker
 from models import Base, User, Meal
-import bcrypt
+from passwords import hash_password, check_password
+from db_utils import set_sqlite_pragmas, ensure_indexes, migrate_password_hashes
+import streamlit as st
 
-# 데이터베이스 엔진 생성
-engine = create_engine('sqlite:///meals.db', echo=True)
-Session = sessionmaker(bind=engine)
+# 데이터베이스 엔진 생성 (프로세스당 한 번만 생성하여 연결 풀을 재사용)
+@st.cache_resource
+def get_engine():
+    engine = create_engine(
+        'sqlite:///meals.db',
+        echo=False,
+        future=True,
+        connect_args={'check_same_thread': False}
+    )
+    event.listen(engine, 'connect', set_sqlite_pragmas)
+    return engine
+
+@st.cache_resource
+def get_sessionmaker():
+    return sessionmaker(bind=get_engine(), expire_on_commit=False)
 
 def initialize_database():
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    ensure_indexes(engine, Base.metadata)
+    migrate_password_hashes(engine)
 
 def get_session():
-    return Session()
+    return get_sessionmaker()()
+
+class MealRow(NamedTuple):
+    id: int
+    name: str
+    calories: float
+    proteins: float
+    carbs: float
+    fats: float
+
+def invalidate_diet_cache():
+    get_diets.clear()
+    get_diet_totals.clear()
 
 def create_user(username, password):
-    session = get_session()
     try:
-        existing_user = session.query(User).filter_by(username=username).first()
+        with get_sessionmaker().begin() as session:
+            existing_user = session.query(User.id).filter_by(username=username).first()
         if existing_user:
             return False  # 이미 존재하는 사용자
-        
-        # 비밀번호 해싱
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        
-        new_user = User(
-            username=username,
-            password=hashed_password.decode('utf-8')
-        )
-        session.add(new_user)
-        session.commit()
+
+        # 비밀번호 해싱 (연결을 잡고 있지 않도록 트랜잭션 밖에서 실행, 동시 가입은 username의 unique 제약으로 막힘)
+        hashed_password = hash_password(password)
+
+        with get_sessionmaker().begin() as session:
+            session.add(User(username=username, password=hashed_password))
         return True
     except Exception as e:
         print(f"Error creating user: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
 def login_user(username, password):
-    session = get_session()
     try:
-        user = session.query(User).filter_by(username=username).first()
+        with get_sessionmaker().begin() as session:
+            user = session.query(User.id, User.password).filter_by(username=username).first()
         if not user:
             return False, "사용자가 존재하지 않습니다.", None
-        
-        if bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+
+        if check_password(password, user.password):
             return True, "로그인 성공!", user.id
         else:
             return False, "비밀번호가 올바르지 않습니다.", None
     except Exception as e:
         print(f"Error logging in: {e}")
         return False, "로그인 중 오류가 발생했습니다.", None
-    finally:
-        session.close()
 
 def get_user(user_id):
-    session = get_session()
-    try:
+    with get_sessionmaker().begin() as session:
         return session.query(User).filter_by(id=user_id).first()
-    finally:
-        session.close()
 
 def verify_password(stored_password, provided_password):
-    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+    return check_password(provided_password, stored_password)
 
 def add_diet(user_id, meal):
-    session = get_session()
     try:
-        new_meal = Meal(
-            user_id=user_id,
-            name=meal['name'],
-            calories=meal['calories'],
-            proteins=meal['proteins'],
-            carbs=meal['carbs'],
-            fats=meal['fats']
-        )
-        session.add(new_meal)
-        session.commit()
+        with get_sessionmaker().begin() as session:
+            session.add(Meal(
+                user_id=user_id,
+                name=meal['name'],
+                calories=meal['calories'],
+                proteins=meal['proteins'],
+                carbs=meal['carbs'],
+                fats=meal['fats']
+            ))
+        invalidate_diet_cache()
         return True
     except Exception as e:
         print(f"Error adding diet: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
 
+def _fetch_diets_raw(user_id):
+    with get_sessionmaker().begin() as session:
+        return session.query(
+            Meal.id, Meal.name, Meal.calories, Meal.proteins, Meal.carbs, Meal.fats
+        ).filter(Meal.user_id == user_id).all()
+
+@st.cache_data(ttl=60, max_entries=128)
 def get_diets(user_id):
-    session = get_session()
-    try:
-        return session.query(Meal).filter_by(user_id=user_id).all()
-    finally:
-        session.close()
+    return [MealRow(*row) for row in _fetch_diets_raw(user_id)]
+
+# 영양소 합계를 SQL에서 계산 (칼로리, 단백질, 탄수화물, 지방 순서)
+@st.cache_data(ttl=30, max_entries=128, show_spinner=False)
+def get_diet_totals(user_id):
+    with get_sessionmaker().begin() as session:
+        totals = session.query(
+            func.sum(Meal.calories), func.sum(Meal.proteins), func.sum(Meal.carbs), func.sum(Meal.fats)
+        ).filter(Meal.user_id == user_id).one()
+    return tuple(total or 0 for total in totals)
 
 def delete_meal(user_id, meal_id):
-    session = get_session()
     try:
-        meal = session.query(Meal).filter_by(user_id=user_id, id=meal_id).first()
-        if meal:
-            session.delete(meal)
-            session.commit()
-            return True
-        else:
-            return False
+        with get_sessionmaker().begin() as session:
+            deleted = session.query(Meal).filter_by(user_id=user_id, id=meal_id).delete(synchronize_session=False)
+        if deleted:
+            invalidate_diet_cache()
+        return deleted > 0
     except Exception as e:
         print(f"Error deleting meal: {e}")
-        session.rollback()
         return False
-    finally:
-        session.close()
+
+# 여러 음식을 한 번의 DELETE ... WHERE id IN (...) 쿼리로 삭제 (삭제된 행 수 반환)
+def delete_meals(user_id, ids):
+    if not ids:
+        return 0
+    try:
+        with get_sessionmaker().begin() as session:
+            result = session.execute(
+                delete(Meal)
+                .where(Meal.user_id == user_id, Meal.id.in_(list(ids)))
+                .execution_options(synchronize_session=False)
+            )
+        invalidate_diet_cache()
+        return result.rowcount
+    except Exception as e:
+        print(f"Error deleting meals: {e}")
+        return 0
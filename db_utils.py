@@ -0,0 +1,25 @@
+# db_utils.py
+
+from sqlalchemy import text
+
+# SQLite 연결 설정 함수 (WAL 모드로 읽기와 쓰기가 서로를 막지 않도록 설정)
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")  # 약 20MB 페이지 캐시
+    cursor.close()
+
+# 기존 데이터베이스에 누락된 인덱스 생성 함수 (create_all은 이미 있는 테이블의 인덱스를 만들지 않음)
+def ensure_indexes(engine, metadata):
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+# 문자열로 저장된 기존 비밀번호 해시를 BLOB으로 변환하는 함수 (이미 변환된 행은 건너뜀)
+def migrate_password_hashes(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE users SET password = CAST(password AS BLOB) WHERE typeof(password) = 'text'"
+        ))
@@ -1,7 +1,7 @@
 # models.py
 
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, LargeBinary, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
@@ -11,7 +11,7 @@ class User(Base):
     
     id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, nullable=False)
-    password = Column(String(100), nullable=False)
+    password = Column(LargeBinary(60), nullable=False)
     
     meals = relationship('Meal', back_populates='user')
 
@@ -27,3 +27,11 @@ class Meal(Base):
     fats = Column(Float, nullable=False)
     
     user = relationship('User', back_populates='meals')
+
+    __table_args__ = (
+        Index('ix_meal_user_cal', 'user_id', 'calories'),
+        Index('ix_meal_user_pro', 'user_id', 'proteins'),
+        Index('ix_meal_user_carb', 'user_id', 'carbs'),
+        Index('ix_meal_user_fat', 'user_id', 'fats'),
+        Index('ix_meal_user_name', 'user_id', 'name'),
+    )
@@ -0,0 +1,27 @@
+# passwords.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+import streamlit as st
+
+# bcrypt 작업 비용 (높을수록 안전하지만 해싱/검증이 느려짐, 환경 변수로 조정 가능)
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 10))
+# 동시에 실행할 bcrypt 작업 수 (CPU 사용량 상한)
+BCRYPT_MAX_WORKERS = 4
+
+# bcrypt 해싱/검증용 스레드 풀 (프로세스당 하나)
+# 호출한 스크립트 스레드는 결과를 기다리므로 실행 시간이 줄지는 않고, 동시에 실행되는 bcrypt 작업 수만 제한함
+@st.cache_resource
+def get_bcrypt_pool():
+    return ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix='bcrypt')
+
+def hash_password(password):
+    return get_bcrypt_pool().submit(
+        bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    ).result()
+
+def check_password(password, hashed_password):
+    return get_bcrypt_pool().submit(
+        bcrypt.checkpw, password.encode('utf-8'), hashed_password
+    ).result()
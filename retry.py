@@ -0,0 +1,42 @@
+# retry.py
+
+import functools
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# 재시도할 HTTP 상태 코드 (요청 제한 및 일시적인 서버 오류)
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 예외에서 HTTP 상태 코드와 응답 헤더 추출 (aiohttp와 requests 예외 모두 지원)
+def _error_status_and_headers(error):
+    status = getattr(error, 'status', None)
+    headers = getattr(error, 'headers', None) or {}
+    response = getattr(error, 'response', None)
+    if response is not None:
+        status = status if status is not None else getattr(response, 'status_code', None)
+        headers = headers or getattr(response, 'headers', None) or {}
+    return status, headers
+
+# 지수 백오프 + 지터 재시도 데코레이터 (retry-after 헤더가 있으면 그 값을 따름)
+def retry_with_backoff(exceptions, max_retries=5, base=1.0, cap=30.0, jitter=0.5):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_retries):
+                try:
+                    return func(*args, **kwargs)
+                except exceptions as e:
+                    status, headers = _error_status_and_headers(e)
+                    if attempt == max_retries - 1 or (status is not None and status not in RETRYABLE_STATUS_CODES):
+                        raise
+                    try:
+                        delay = min(cap, float(headers.get('retry-after') or headers.get('Retry-After')))
+                    except (TypeError, ValueError):
+                        delay = min(cap, base * (2 ** attempt)) * random.uniform(1 - jitter, 1)
+                    logger.warning(f"{func.__name__} 요청 실패: {e}. {delay:.1f}초 후 재시도 {attempt + 1}/{max_retries - 1}")
+                    time.sleep(delay)
+        return wrapper
+    return decorator